@@ -2,11 +2,18 @@
 
 import argparse
 import asyncio
+from dataclasses import dataclass
 import json
+import os
 import sys
+import time
 import uuid
 
+from ament_index_python import has_resource
 import rclpy
+from rclpy.callback_groups import ReentrantCallbackGroup
+from rclpy.executors import MultiThreadedExecutor
+from rclpy.logging import LoggingSeverity
 from rclpy.node import Node
 from rclpy.parameter import Parameter
 from rclpy.qos import QoSDurabilityPolicy as Durability
@@ -17,6 +24,124 @@ from rclpy.qos import QoSReliabilityPolicy as Reliability
 from rmf_mm_msgs.srv import CheckEffector, CheckMmZone
 from rmf_task_msgs.msg import ApiRequest, ApiResponse
 
+# Keep the request around for a fleet adapter that subscribes late.
+TRANSIENT_QOS = QoSProfile(
+    history=History.KEEP_LAST,
+    depth=1,
+    reliability=Reliability.RELIABLE,
+    durability=Durability.TRANSIENT_LOCAL,
+)
+
+# A volatile reliable reader is compatible with both volatile and
+# transient local reliable writers of the responses.
+RESPONSE_QOS = QoSProfile(
+    history=History.KEEP_LAST,
+    depth=10,
+    reliability=Reliability.RELIABLE,
+    durability=Durability.VOLATILE,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj, indent=False):
+    """Serialize obj to a JSON str, with orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+###############################################################################
+
+
+@dataclass(slots=True, frozen=True)
+class DispatchArgs:
+    """Parsed command line arguments of an arm task request."""
+
+    fleet: str
+    robot: str
+    places: list[str]
+    action: str
+    action_desc: str
+    object_name: str | None
+    action2: str
+    action_desc2: str
+    object_name2: str | None
+    start_time: int
+    priority: int
+    use_sim_time: bool
+
+
+def _build_activities(action, object_name, zone_name, action_desc, places):
+    """
+    Build the activities performing an action.
+
+    :return: zone and perform_action activities when the action works on an
+        object in a known zone, a perform_action activity when there is no
+        object, and no activities when the zone of the object is unknown
+    """
+    if not object_name:
+        return [
+            {
+                'category': 'perform_action',
+                'description': {
+                    'unix_millis_action_duration_estimate': 60000,
+                    'category': action,
+                    'description': action_desc,
+                },
+            }
+        ]
+    if zone_name is None:
+        return []
+    return [
+        {
+            'category': 'zone',
+            'description': {'zone': zone_name, 'places': places},
+        },
+        {
+            'category': 'perform_action',
+            'description': {
+                'unix_millis_action_duration_estimate': 60000,
+                'category': action,
+                'description': {**action_desc, 'zone_name': zone_name},
+            },
+        },
+    ]
+
+
+def _build_payload(fleet, robot, action, activities, start_time):
+    """Build the composed task request payload of the activities."""
+    request = {
+        'category': 'compose',
+        'description': {
+            'category': action,
+            'phases': [
+                {
+                    'activity': {
+                        'category': 'sequence',
+                        'description': {'activities': activities},
+                    }
+                }
+            ],
+        },
+        'unix_millis_earliest_start_time': start_time,
+    }
+    if fleet and robot:
+        return {
+            'type': 'robot_task_request',
+            'robot': robot,
+            'fleet': fleet,
+            'request': request,
+        }
+    return {'type': 'dispatch_task_request', 'request': request}
+
+
 ###############################################################################
 
 
@@ -120,25 +245,41 @@ class TaskRequester(Node):
             action='store_true',
             help='Use sim time, default: false',
         )
-        self.args = parser.parse_args(argv[1:])
-
-        transient_qos = QoSProfile(
-            history=History.KEEP_LAST,
-            depth=1,
-            reliability=Reliability.RELIABLE,
-            durability=Durability.TRANSIENT_LOCAL,
+        self.args = DispatchArgs(**vars(parser.parse_args(argv[1:])))
+        self.action_desc = _loads(self.args.action_desc)
+        self.action_desc2 = (
+            _loads(self.args.action_desc2) if self.args.action2 else None
         )
 
+        # Let service responses be handled while the setup task awaits them
+        self.cb_group = ReentrantCallbackGroup()
+
         self.task_pub = self.create_publisher(
-            ApiRequest, 'task_api_requests', transient_qos
+            ApiRequest, 'task_api_requests', TRANSIENT_QOS
+        )
+        # Subscribe before publishing so the response cannot be missed
+        self.api_response_sub = self.create_subscription(
+            ApiResponse,
+            'task_api_responses',
+            self.api_response_callback,
+            RESPONSE_QOS,
+            callback_group=self.cb_group,
         )
         self.effector_query_service_client = self.create_client(
-            CheckEffector, f'{self.args.fleet}_effector_query'
+            CheckEffector,
+            f'{self.args.fleet}_effector_query',
+            callback_group=self.cb_group,
         )
         self.zone_service_client = self.create_client(
-            CheckMmZone, 'mm_zone_query'
+            CheckMmZone, 'mm_zone_query', callback_group=self.cb_group
         )
 
+        # call_async serializes the request right away, so a single request
+        # object per service is reused for every query
+        self.zone_request = CheckMmZone.Request()
+        self.effector_request = CheckEffector.Request()
+        self.effector_request.robot_name = self.args.robot
+
         # enable ros sim time
         if self.args.use_sim_time:
             self.get_logger().info('Using Sim Time')
@@ -152,64 +293,81 @@ class TaskRequester(Node):
         self.msg_request_id = ''
         self.object_zone_name = None
         self.object_zone_name2 = None
-        self.zone_requests_pending = 0
-        self.effector_checks_pending = 0
 
+        if self.args.action != 'arm_action':
+            self.wait_for_services(
+                [self.zone_service_client, self.effector_query_service_client]
+            )
+
+    async def setup(self):
+        """Run the zone and effector checks, then dispatch the task."""
         if self.args.action == 'arm_action':
             self.send_dispatch_arm_task()
-        else:
-            # Count how many zone requests we need to make
-            if self.args.object_name:
-                self.zone_requests_pending += 1
-            if self.args.action2 and self.args.object_name2:
-                self.zone_requests_pending += 1
-
-            # Count how many effector checks we need to make
-            self.effector_checks_pending += 1
-            if self.args.action2:
-                self.effector_checks_pending += 1
-
-            # Send zone requests
-            if self.args.object_name:
-                self.send_zone_request(self.args.object_name, is_second=False)
-            if self.args.action2 and self.args.object_name2:
-                self.send_zone_request(self.args.object_name2, is_second=True)
-
-            # Send effector queries
-            self.send_effector_query(self.args.action, is_second=False)
-            if self.args.action2:
-                self.send_effector_query(self.args.action2, is_second=True)
-
-    def send_zone_request(self, object_name, is_second=False):
-        while not self.zone_service_client.wait_for_service(timeout_sec=5.0):
-            self.get_logger().info(
-                'Waiting for mm_zone_query to become available...'
+            return
+
+        # Fire every request before awaiting any of them
+        zone_futures = []
+        if self.args.object_name:
+            zone_futures.append(
+                (self.send_zone_request(self.args.object_name), False)
+            )
+        if self.args.action2 and self.args.object_name2:
+            zone_futures.append(
+                (self.send_zone_request(self.args.object_name2), True)
+            )
+
+        effector_futures = [
+            (self.send_effector_query(self.args.action), False)
+        ]
+        if self.args.action2:
+            effector_futures.append(
+                (self.send_effector_query(self.args.action2), True)
             )
 
-        # Create a request object
-        request = CheckMmZone.Request()
+        for future, is_second in zone_futures:
+            await future
+            if not self.check_zone_result(future, is_second):
+                self.response.cancel()
+                return
+        for future, is_second in effector_futures:
+            await future
+            if not self.check_effector_result(future, is_second):
+                self.response.cancel()
+                return
+
+        self.get_logger().info('All checks complete, dispatching task')
+        self.send_dispatch_arm_task()
+
+    def wait_for_services(self, clients):
+        """Block until the services of all clients are available."""
+        # Discovery of every service progresses in the background, so the
+        # total wait is bounded by the slowest service rather than the sum.
+        for client in clients:
+            while not client.wait_for_service(timeout_sec=5.0):
+                self.get_logger().info(
+                    f'Waiting for {client.srv_name} to become available...'
+                )
+
+    def send_zone_request(self, object_name):
+        """Send a zone query for an object and return its future."""
+        request = self.zone_request
         request.object_name = object_name
 
         # Send the request asynchronously
         self.get_logger().info(
             f'Sending request to check zone for object [{object_name}]'
         )
-        future = self.zone_service_client.call_async(request)
-        future.add_done_callback(
-            lambda f: self.zone_request_service_callback(f, is_second)
-        )
+        return self.zone_service_client.call_async(request)
 
-    def zone_request_service_callback(self, future, is_second=False):
-        """Insert docstring here."""
+    def check_zone_result(self, future, is_second=False):
+        """Store the zone of a completed zone query, return if it succeeded."""
         result = future.result()
         if result is None:
             self.get_logger().error('Service call failed')
-            self.response.cancel()
-            return
+            return False
         if not result.is_mm_zone or not result.zone_name:
             self.get_logger().warn(f'Result: {result.result}')
-            self.response.cancel()
-            return
+            return False
 
         if is_second:
             self.object_zone_name2 = result.zone_name
@@ -217,62 +375,35 @@ class TaskRequester(Node):
         else:
             self.object_zone_name = result.zone_name
             self.get_logger().info(f'Result: {result.result}')
+        return True
 
-        self.zone_requests_pending -= 1
-        self.check_if_ready_to_dispatch()
-
-    def send_effector_query(self, action_name, is_second=False):
-        """Insert docstring here."""
-        while not self.effector_query_service_client.wait_for_service(
-            timeout_sec=5.0
-        ):
-            self.get_logger().info(
-                f'Waiting for {self.args.fleet}_effector_query to become available...'
-            )
-
-        # Create service
-        req = CheckEffector.Request()
-        req.robot_name = self.args.robot
+    def send_effector_query(self, action_name):
+        """Send an effector query for an action and return its future."""
+        req = self.effector_request
         req.action_name = action_name
 
         # Send the request asynchronously
         self.get_logger().info(
             f'Sending request to check effector for action [{action_name}]'
         )
-        future = self.effector_query_service_client.call_async(req)
-        future.add_done_callback(
-            lambda f: self.effector_query_service_callback(f, is_second)
-        )
+        return self.effector_query_service_client.call_async(req)
 
-    def effector_query_service_callback(self, future, is_second=False):
-        """Insert docstring here."""
+    def check_effector_result(self, future, is_second=False):
+        """Check a completed effector query, return if the effector is ready."""
         result = future.result()
         if result is None:
             self.get_logger().error('Service call failed')
-            self.response.cancel()
-            return
+            return False
 
+        action_label = 'action2' if is_second else 'action'
         if not result.effector_ready:
-            action_label = 'action2' if is_second else 'action'
             self.get_logger().warn(f'Effector not ready for {action_label}')
-            self.response.cancel()
-            return
+            return False
 
-        action_label = 'action2' if is_second else 'action'
         self.get_logger().info(
             f'Service call succeeded for {action_label}: {result}'
         )
-        self.effector_checks_pending -= 1
-        self.check_if_ready_to_dispatch()
-
-    def check_if_ready_to_dispatch(self):
-        """Check if all service calls are complete and ready to dispatch."""
-        if (
-            self.zone_requests_pending == 0
-            and self.effector_checks_pending == 0
-        ):
-            self.get_logger().info('All checks complete, dispatching task')
-            self.send_dispatch_arm_task()
+        return True
 
     # ====================== Task Api Request ============================
 
@@ -283,7 +414,7 @@ class TaskRequester(Node):
         :param msg: ApiResponse msg
         """
         if response_msg.request_id == self.msg_request_id:
-            self.response.set_result(json.loads(response_msg.json_msg))
+            self.response.set_result(response_msg.json_msg)
 
     def create_dispatch_arm_task(self) -> ApiRequest:
         """
@@ -292,120 +423,52 @@ class TaskRequester(Node):
         :param task: task name
         :return: Api Request msg
         """
+        args = self.args
         msg = ApiRequest()
-        msg.request_id = 'dispatch_arm_task_' + str(uuid.uuid4())
-        payload = {}
+        msg.request_id = f'dispatch_arm_task_{uuid.uuid4().hex}'
 
-        if self.args.fleet and self.args.robot:
+        if args.fleet and args.robot:
             self.get_logger().info("Using 'robot_task_request'")
-            payload['type'] = 'robot_task_request'
-            payload['robot'] = self.args.robot
-            payload['fleet'] = self.args.fleet
         else:
             self.get_logger().info("Using 'dispatch_task_request'")
-            payload['type'] = 'dispatch_task_request'
-        request = {}
 
         # Set task request start time
-        now = self.get_clock().now().to_msg()
-        now.sec = now.sec + self.args.start_time
-        start_time = now.sec * 1000 + round(now.nanosec / 10**6)
-
-        # Add activities
-        request = {}
-        activities = []
-
-        # Helper function to add activities for an action
-        def add_action_activities(
-            action, object_name, zone_name, action_desc, places
-        ):
-            action_desc_dict = json.loads(action_desc)
-
-            if object_name:
-                if zone_name is not None:
-                    action_desc_dict['zone_name'] = zone_name
-                    activities.append(
-                        {
-                            'category': 'zone',
-                            'description': {
-                                'zone': zone_name,
-                                'places': places,
-                            },
-                        }
-                    )
-                    activities.append(
-                        {
-                            'category': 'perform_action',
-                            'description': {
-                                'unix_millis_action_duration_estimate': 60000,
-                                'category': action,
-                                'description': action_desc_dict,
-                            },
-                        }
-                    )
-            else:
-                activities.append(
-                    {
-                        'category': 'perform_action',
-                        'description': {
-                            'unix_millis_action_duration_estimate': 60000,
-                            'category': action,
-                            'description': action_desc_dict,
-                        },
-                    }
-                )
+        ns = self.get_clock().now().nanoseconds
+        start_time = (ns + args.start_time * 1_000_000_000) // 1_000_000
 
-        # Add first action
-        add_action_activities(
-            self.args.action,
-            self.args.object_name,
+        activities = _build_activities(
+            args.action,
+            args.object_name,
             self.object_zone_name,
-            self.args.action_desc,
-            self.args.places,
+            self.action_desc,
+            args.places,
         )
-
-        # Add second action if provided
-        if self.args.action2:
-            add_action_activities(
-                self.args.action2,
-                self.args.object_name2,
+        if args.action2:
+            activities += _build_activities(
+                args.action2,
+                args.object_name2,
                 self.object_zone_name2,
-                self.args.action_desc2,
-                self.args.places,
+                self.action_desc2,
+                args.places,
             )
 
-        request = {
-            'category': 'compose',
-            'description': {
-                'category': self.args.action,
-                'phases': [
-                    {
-                        'activity': {
-                            'category': 'sequence',
-                            'description': {'activities': activities},
-                        }
-                    }
-                ],
-            },
-            'unix_millis_earliest_start_time': start_time,
-        }
-        payload['request'] = request
-        msg.json_msg = json.dumps(payload)
-
-        print(
-            f'DispatchArmTask msg payload: \n{json.dumps(payload, indent=2)}\n'
+        payload = _build_payload(
+            args.fleet, args.robot, args.action, activities, start_time
         )
+        msg.json_msg = _dumps(payload)
+
+        if self.get_logger().is_enabled_for(LoggingSeverity.DEBUG):
+            print(
+                'DispatchArmTask msg payload: \n'
+                f'{_dumps(payload, indent=True)}\n'
+            )
         return msg
 
     def send_dispatch_arm_task(self):
         """Send arm task to mm fleet adapter."""
         msg = self.create_dispatch_arm_task()
-        self.task_pub.publish(msg)
         self.msg_request_id = msg.request_id
-
-        self.api_response_sub = self.create_subscription(
-            ApiResponse, 'task_api_responses', self.api_response_callback, 10
-        )
+        self.task_pub.publish(msg)
 
 
 ###############################################################################
@@ -413,14 +476,29 @@ class TaskRequester(Node):
 
 def main(argv=sys.argv):
     """Insert docstring here."""
+    # Prefer Cyclone DDS for this latency-bound request/response exchange,
+    # unless a middleware was chosen explicitly or Cyclone is not installed
+    if 'RMW_IMPLEMENTATION' not in os.environ and has_resource(
+        'packages', 'rmw_cyclonedds_cpp'
+    ):
+        os.environ['RMW_IMPLEMENTATION'] = 'rmw_cyclonedds_cpp'
+
     rclpy.init(args=sys.argv)
     args_without_ros = rclpy.utilities.remove_ros_args(sys.argv)
 
     task_requester = TaskRequester(args_without_ros)
 
-    rclpy.spin_until_future_complete(
-        task_requester, task_requester.response, timeout_sec=5
-    )
+    executor = MultiThreadedExecutor(num_threads=4)
+    executor.add_node(task_requester)
+    executor.create_task(task_requester.setup())
+    # Spin in short slices so we return as soon as the response is in or
+    # the timeout expires
+    deadline = time.monotonic() + 5.0
+    while not task_requester.response.done():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        executor.spin_once(timeout_sec=min(0.05, remaining))
 
     try:
         if task_requester.response.done():
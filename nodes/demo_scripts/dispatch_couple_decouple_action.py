@@ -16,11 +16,17 @@
 
 import argparse
 import asyncio
+from dataclasses import dataclass
+from functools import partial
 import json
+import os
 import sys
+import time
 import uuid
 
+from ament_index_python import has_resource
 import rclpy
+from rclpy.executors import SingleThreadedExecutor
 from rclpy.node import Node
 from rclpy.parameter import Parameter
 from rclpy.qos import QoSDurabilityPolicy as Durability
@@ -31,9 +37,69 @@ from rclpy.qos import QoSReliabilityPolicy as Reliability
 from rmf_task_msgs.msg import ApiRequest
 from rmf_task_msgs.msg import ApiResponse
 
+try:
+    # Waits on entity events instead of rebuilding the wait set every spin
+    from rclpy.experimental import EventsExecutor as Executor
+except ImportError:
+    Executor = SingleThreadedExecutor
+
+# Keep the request around for a fleet adapter that subscribes late.
+TRANSIENT_QOS = QoSProfile(
+    history=History.KEEP_LAST,
+    depth=1,
+    reliability=Reliability.RELIABLE,
+    durability=Durability.TRANSIENT_LOCAL,
+)
+
+# A volatile reliable reader is compatible with both volatile and
+# transient local reliable writers of the responses.
+RESPONSE_QOS = QoSProfile(
+    history=History.KEEP_LAST,
+    depth=10,
+    reliability=Reliability.RELIABLE,
+    durability=Durability.VOLATILE,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj, indent=False):
+    """Serialize obj to a JSON str, with orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
+
+
 ###############################################################################
 
 
+@dataclass(slots=True, frozen=True)
+class CoupleDecoupleArgs:
+    """Parsed command line arguments of a couple/decouple request."""
+
+    pickups: list[str] | None
+    dropoffs: list[str] | None
+    pickup_handlers: list[str] | None
+    dropoff_handlers: list[str] | None
+    pickup_payloads: list[str]
+    dropoff_payloads: list[str]
+    fleet: str | None
+    robot: str | None
+    start_time: int
+    priority: int
+    use_sim_time: bool
+    requester: str
+    action: str
+    zone_name: str
+    candidates_fleet: str | None
+    candidates_robot: list[str] | str
+    number_of_robots: int
+
+
 class TaskRequester(Node):
     """Task requester."""
 
@@ -144,50 +210,43 @@ class TaskRequester(Node):
         parser.add_argument('-cN', '--number_of_robots', type=int, default=2,
                             help='Number of robots to use')
 
-        self.args = parser.parse_args(argv[1:])
+        self.args = CoupleDecoupleArgs(**vars(parser.parse_args(argv[1:])))
+        args = self.args
         self.response = asyncio.Future()
 
-        transient_qos = QoSProfile(
-            history=History.KEEP_LAST,
-            depth=1,
-            reliability=Reliability.RELIABLE,
-            durability=Durability.TRANSIENT_LOCAL,
-        )
-
         self.pub = self.create_publisher(
-            ApiRequest, 'task_api_requests', transient_qos
+            ApiRequest, 'task_api_requests', TRANSIENT_QOS
         )
 
         # enable ros sim time
-        if self.args.use_sim_time:
+        if args.use_sim_time:
             self.get_logger().info('Using Sim Time')
             param = Parameter('use_sim_time', Parameter.Type.BOOL, True)
             self.set_parameters([param])
 
         # Construct task
         msg = ApiRequest()
-        msg.request_id = 'couple_decouple_action_' + str(uuid.uuid4())
+        msg.request_id = f'couple_decouple_action_{uuid.uuid4().hex}'
         payload = {}
-        if self.args.fleet and self.args.robot:
+        if args.fleet and args.robot:
             self.get_logger().info("Using 'robot_task_request'")
             payload['type'] = 'robot_task_request'
-            payload['robot'] = self.args.robot
-            payload['fleet'] = self.args.fleet
+            payload['robot'] = args.robot
+            payload['fleet'] = args.fleet
         else:
             self.get_logger().info("Using 'dispatch_task_request'")
             payload['type'] = 'dispatch_task_request'
         request = {}
 
         # Set task request request time, start time and requester
-        now = self.get_clock().now().to_msg()
-        now.sec = now.sec + self.args.start_time
-        start_time = now.sec * 1000 + round(now.nanosec / 10**6)
+        ns = self.get_clock().now().nanoseconds
+        start_time = (ns + args.start_time * 1_000_000_000) // 1_000_000
         request['unix_millis_request_time'] = start_time
         request['unix_millis_earliest_start_time'] = start_time
-        request['requester'] = self.args.requester
+        request['requester'] = args.requester
 
-        if self.args.fleet:
-            request['fleet_name'] = self.args.fleet
+        if args.fleet:
+            request['fleet_name'] = args.fleet
 
         def __create_couple_decouple_desc(action, expected_zone, number_of_robots, input_candidates):
             """Create couple/decouple description."""
@@ -212,20 +271,14 @@ class TaskRequester(Node):
                     'estimated_duration': 60,  # seconds
                 }
 
-        number_of_robots = 2
-        if self.args.number_of_robots >= 2:
-            number_of_robots = self.args.number_of_robots
+        number_of_robots = max(args.number_of_robots, 2)
 
         input_candidates = {}
-
-        candidates_fleet = ''
-        if self.args.candidates_fleet != '':
-            candidates_fleet = self.args.candidates_fleet
-        candidates_robot = []
-        if self.args.candidates_robot != '':
-            for i in range(len(self.args.candidates_robot)):
-                candidates_robot.append(self.args.candidates_robot[i])
-            input_candidates = {'fleet': candidates_fleet, 'robots': candidates_robot}
+        if args.candidates_robot:
+            input_candidates = {
+                'fleet': args.candidates_fleet,
+                'robots': list(args.candidates_robot),
+            }
 
         # Define multi_delivery with request category compose
         request['category'] = 'compose'
@@ -236,25 +289,21 @@ class TaskRequester(Node):
         description['phases'] = []
         activities = []
 
-        if self.args.action not in ['couple', 'decouple']:
+        if args.action not in ['couple', 'decouple']:
             raise ValueError("Action should be 'couple' or 'decouple'")
-        
-        if self.args.action == 'couple':
-            activities.append(
-                {
-                    'category': 'couple_action',
-                    'description': __create_couple_decouple_desc('couple', self.args.zone, number_of_robots, input_candidates),
-                }
-            )
-        
-        else:
-            activities.append(
-                {
-                    'category': 'decouple_action',
-                    'description': __create_couple_decouple_desc('decouple', self.args.zone, number_of_robots, input_candidates),
-                }
-            )
-        
+
+        activities.append(
+            {
+                'category': f'{args.action}_action',
+                'description': __create_couple_decouple_desc(
+                    args.action,
+                    args.zone_name,
+                    number_of_robots,
+                    input_candidates,
+                ),
+            }
+        )
+
         # Add activities to phases
         description['phases'].append(
             {
@@ -267,33 +316,51 @@ class TaskRequester(Node):
 
         request['description'] = description
         payload['request'] = request
-        msg.json_msg = json.dumps(payload)
-
-        def receive_response(response_msg: ApiResponse):
-            if response_msg.request_id == msg.request_id:
-                self.response.set_result(json.loads(response_msg.json_msg))
+        msg.json_msg = _dumps(payload)
 
         self.sub = self.create_subscription(
-            ApiResponse, 'task_api_responses', receive_response, 10
+            ApiResponse,
+            'task_api_responses',
+            partial(self.receive_response, msg.request_id),
+            RESPONSE_QOS,
         )
 
-        print(f'Json msg payload: \n{json.dumps(payload, indent=2)}')
+        print(f'Json msg payload: \n{_dumps(payload, indent=True)}')
 
         self.pub.publish(msg)
 
+    def receive_response(self, request_id, response_msg: ApiResponse):
+        """Resolve the response future with the response to request_id."""
+        if response_msg.request_id == request_id:
+            self.response.set_result(response_msg.json_msg)
+
 
 ###############################################################################
 
 
 def main(argv=sys.argv):
     """Dispatch a couple/decouple Action."""
+    # Prefer Cyclone DDS for this latency-bound request/response exchange,
+    # unless a middleware was chosen explicitly or Cyclone is not installed
+    if 'RMW_IMPLEMENTATION' not in os.environ and has_resource(
+        'packages', 'rmw_cyclonedds_cpp'
+    ):
+        os.environ['RMW_IMPLEMENTATION'] = 'rmw_cyclonedds_cpp'
+
     rclpy.init(args=sys.argv)
     args_without_ros = rclpy.utilities.remove_ros_args(sys.argv)
 
     task_requester = TaskRequester(args_without_ros)
-    rclpy.spin_until_future_complete(
-        task_requester, task_requester.response, timeout_sec=5.0
-    )
+    executor = Executor()
+    executor.add_node(task_requester)
+    # Spin in short slices so we return as soon as the response is in or
+    # the timeout expires
+    deadline = time.monotonic() + 5.0
+    while not task_requester.response.done():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        executor.spin_once(timeout_sec=min(0.05, remaining))
     if task_requester.response.done():
         print(f'Got response: \n{task_requester.response.result()}')
     else: